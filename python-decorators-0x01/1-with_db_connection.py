@@ -1,14 +1,59 @@
 import sqlite3
 import functools
+import queue
+import atexit
+
+# Pool of open connections reused across decorated calls (most recently
+# released first, so the hottest page cache is handed out next)
+_POOL = queue.LifoQueue(maxsize=8)
+
+
+def _acquire():
+    """
+    Get an open connection from the pool, or create a new one.
+
+    New connections run in autocommit mode with WAL journaling and an
+    8MB page cache, and may be shared across threads.
+    """
+    try:
+        return _POOL.get_nowait()
+    except queue.Empty:
+        conn = sqlite3.connect(
+            'users.db', isolation_level=None, check_same_thread=False
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA cache_size=-8000')
+        return conn
+
+
+def _release(conn):
+    """Return a connection to the pool, closing it if the pool is full."""
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _POOL.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+@atexit.register
+def _close_pool():
+    """Close every pooled connection at interpreter shutdown."""
+    while True:
+        try:
+            _POOL.get_nowait().close()
+        except queue.Empty:
+            break
+
 
 def with_db_connection(func):
     """
     Decorator that automatically handles database connection lifecycle.
     
     This decorator:
-    1. Opens a database connection
+    1. Takes a database connection from the pool (opening one if needed)
     2. Passes the connection as the first argument to the decorated function
-    3. Ensures the connection is closed after function execution
+    3. Ensures the connection is returned to the pool after execution
     4. Handles exceptions properly to prevent connection leaks
     
     Args:
@@ -27,8 +72,8 @@ def with_db_connection(func):
     
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Open database connection
-        conn = sqlite3.connect('users.db')
+        # Borrow a pooled database connection
+        conn = _acquire()
         
         try:
             # Call the original function with connection as first argument
@@ -43,8 +88,8 @@ def with_db_connection(func):
             raise
             
         finally:
-            # Always close the connection, even if an error occurred
-            conn.close()
+            # Always release the connection, even if an error occurred
+            _release(conn)
     
     return wrapper
 
@@ -2,7 +2,10 @@ import time
 import sqlite3
 import functools
 import hashlib
+import inspect
 import json
+import pickle
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
 def with_db_connection(func):
@@ -17,8 +20,8 @@ def with_db_connection(func):
     """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Open database connection
-        conn = sqlite3.connect('users.db')
+        # Open database connection (with a larger prepared statement cache)
+        conn = sqlite3.connect('users.db', cached_statements=256)
         
         try:
             # Call the original function with connection as first argument
@@ -38,8 +41,19 @@ def with_db_connection(func):
     return wrapper
 
 
-# Global query cache dictionary
-query_cache = {}
+# Global query cache dictionary, kept in insertion (oldest-first) order
+query_cache = OrderedDict()
+
+# Compressed results smaller than this many bytes are stored unpacked,
+# since unpickling on every hit would cost more than the memory saved
+COMPRESS_MIN_BYTES = 4096
+
+# Running totals over the live cache entries, so get_cache_stats() never
+# has to scan or sort the cache
+_stats = {
+    'total_hits': 0,
+    'sum_insertion_time': 0.0
+}
 
 
 class CacheEntry:
@@ -51,12 +65,22 @@ class CacheEntry:
         timestamp: When the result was cached
         hit_count: Number of times this cache entry was accessed
         query_hash: Hash of the original query for identification
+        packed: Whether result holds the pickled bytes of the real result
     """
-    def __init__(self, result, query_hash):
+    __slots__ = ('result', 'timestamp', 'hit_count', 'query_hash', 'packed')
+    
+    def __init__(self, result, query_hash, packed=False):
         self.result = result
         self.timestamp = datetime.now()
         self.hit_count = 0
         self.query_hash = query_hash
+        self.packed = packed
+    
+    def get_result(self):
+        """Return the cached result, unpickling it if it was stored packed"""
+        if self.packed:
+            return pickle.loads(self.result)
+        return self.result
     
     def is_expired(self, ttl_seconds=300):
         """Check if cache entry is expired (default 5 minutes TTL)"""
@@ -71,7 +95,7 @@ class CacheEntry:
         return (datetime.now() - self.timestamp).total_seconds()
 
 
-def cache_query(ttl=300):
+def cache_query(ttl=300, compress=False):
     """
     Decorator that caches database query results to avoid redundant calls.
     
@@ -84,6 +108,8 @@ def cache_query(ttl=300):
     Args:
         ttl (int): Time-to-live for cached results in seconds (default: 300 = 5 minutes)
                   Set to 0 for no expiration
+        compress (bool): Store large results pickled to shrink the memory
+                         they pin in the cache (default: False)
     
     Returns:
         Decorator function that adds caching functionality
@@ -96,46 +122,60 @@ def cache_query(ttl=300):
             return cursor.fetchall()
     """
     def decorator(func):
+        # Resolve everything that is fixed per decorated function up front,
+        # so each call only reads closure variables
+        func_name = func.__name__
+        params = list(inspect.signature(func).parameters)
+        # Skip the connection object (first argument) when generating key
+        first_arg = 1 if params and params[0] == 'conn' else 0
+        
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key from function arguments
-            cache_key = _generate_cache_key(func.__name__, args, kwargs)
+            cache_key = _generate_cache_key(func_name, args[first_arg:], kwargs)
             
-            # Check if we have a cached result
-            if cache_key in query_cache:
-                cache_entry = query_cache[cache_key]
-                
+            # Check if we have a cached result (single dictionary lookup)
+            cache_entry = query_cache.get(cache_key)
+            if cache_entry is not None:
                 # Check if cache entry is still valid
                 if not cache_entry.is_expired(ttl):
                     cache_entry.hit_count += 1
+                    _stats['total_hits'] += 1
                     age_seconds = cache_entry.get_age_seconds()
                     
-                    print(f"CACHE HIT: {func.__name__} (age: {age_seconds:.1f}s, hits: {cache_entry.hit_count})")
-                    return cache_entry.result
+                    print(f"CACHE HIT: {func_name} (age: {age_seconds:.1f}s, hits: {cache_entry.hit_count})")
+                    return cache_entry.get_result()
                 else:
                     # Cache expired - remove it
-                    print(f"CACHE EXPIRED: {func.__name__} (age: {cache_entry.get_age_seconds():.1f}s)")
-                    del query_cache[cache_key]
+                    print(f"CACHE EXPIRED: {func_name} (age: {cache_entry.get_age_seconds():.1f}s)")
+                    _remove_entry(cache_key)
             
             # Cache miss - execute the function
-            print(f"CACHE MISS: {func.__name__} - executing query")
+            print(f"CACHE MISS: {func_name} - executing query")
             start_time = time.time()
             
             try:
                 result = func(*args, **kwargs)
                 execution_time = time.time() - start_time
                 
-                # Cache the result
-                query_hash = hashlib.md5(cache_key.encode()).hexdigest()[:8]
-                cache_entry = CacheEntry(result, query_hash)
+                # Cache the result (the key is already an MD5 digest)
+                query_hash = cache_key[:8]
+                cache_entry = None
+                if compress:
+                    payload = pickle.dumps(result, protocol=5)
+                    if len(payload) >= COMPRESS_MIN_BYTES:
+                        cache_entry = CacheEntry(payload, query_hash, packed=True)
+                if cache_entry is None:
+                    cache_entry = CacheEntry(result, query_hash)
                 query_cache[cache_key] = cache_entry
+                _stats['sum_insertion_time'] += cache_entry.timestamp.timestamp()
                 
-                print(f"CACHED: {func.__name__} (execution: {execution_time:.3f}s, cached {len(result) if hasattr(result, '__len__') else '?'} results)")
+                print(f"CACHED: {func_name} (execution: {execution_time:.3f}s, cached {len(result) if hasattr(result, '__len__') else '?'} results)")
                 return result
                 
             except Exception as e:
                 execution_time = time.time() - start_time
-                print(f"QUERY FAILED: {func.__name__} after {execution_time:.3f}s - {e}")
+                print(f"QUERY FAILED: {func_name} after {execution_time:.3f}s - {e}")
                 raise
         
         return wrapper
@@ -157,19 +197,17 @@ def _generate_cache_key(func_name, args, kwargs):
     
     Args:
         func_name (str): Name of the function being cached
-        args (tuple): Positional arguments passed to function
+        args (tuple): Positional arguments passed to function, excluding
+                      the connection object
         kwargs (dict): Keyword arguments passed to function
         
     Returns:
         str: Unique cache key
     """
-    # Skip the connection object (first argument) when generating key
-    relevant_args = args[1:] if args else ()
-    
     # Create a deterministic representation of the arguments
     key_data = {
         'function': func_name,
-        'args': relevant_args,
+        'args': args,
         'kwargs': kwargs
     }
     
@@ -180,11 +218,20 @@ def _generate_cache_key(func_name, args, kwargs):
     return hashlib.md5(key_string.encode()).hexdigest()
 
 
+def _remove_entry(cache_key):
+    """Remove a cache entry and take it out of the running statistics"""
+    cache_entry = query_cache.pop(cache_key)
+    _stats['total_hits'] -= cache_entry.hit_count
+    _stats['sum_insertion_time'] -= cache_entry.timestamp.timestamp()
+
+
 def clear_cache():
     """Clear all cached query results"""
     global query_cache
     cleared_count = len(query_cache)
     query_cache.clear()
+    _stats['total_hits'] = 0
+    _stats['sum_insertion_time'] = 0.0
     print(f"Cache cleared: {cleared_count} entries removed")
 
 
@@ -194,16 +241,15 @@ def get_cache_stats():
         return {"message": "Cache is empty"}
     
     total_entries = len(query_cache)
-    total_hits = sum(entry.hit_count for entry in query_cache.values())
+    total_hits = _stats['total_hits']
     
-    # Calculate average age
-    total_age = sum(entry.get_age_seconds() for entry in query_cache.values())
-    avg_age = total_age / total_entries if total_entries > 0 else 0
+    # Calculate average age from the running sum of insertion times
+    now = datetime.now().timestamp()
+    avg_age = now - _stats['sum_insertion_time'] / total_entries
     
-    # Find oldest and newest entries
-    entries_by_age = sorted(query_cache.values(), key=lambda e: e.timestamp)
-    oldest_age = entries_by_age[0].get_age_seconds() if entries_by_age else 0
-    newest_age = entries_by_age[-1].get_age_seconds() if entries_by_age else 0
+    # Entries are stored in insertion order, so the ends are oldest/newest
+    oldest_age = next(iter(query_cache.values())).get_age_seconds()
+    newest_age = next(reversed(query_cache.values())).get_age_seconds()
     
     return {
         "total_entries": total_entries,
@@ -271,8 +317,16 @@ def get_user_by_id_cached(conn, user_id):
     return cursor.fetchone()
 
 
+# Fixed SQL text for each static table, so SQLite can reuse the compiled
+# statement across calls
+_STMT = {
+    'categories': 'SELECT * FROM categories',
+    'users': 'SELECT * FROM users'
+}
+
+
 @with_db_connection
-@cache_query(ttl=0)  # Never expires
+@cache_query(ttl=0, compress=True)  # Never expires, so keep it compact
 def get_static_data_cached(conn, table_name):
     """
     Get static reference data with permanent caching.
@@ -286,10 +340,15 @@ def get_static_data_cached(conn, table_name):
         
     Returns:
         list: All records from the specified table
+        
+    Raises:
+        ValueError: If table_name is not a known static table
     """
+    if table_name not in _STMT:
+        raise ValueError(f"Unknown static table: {table_name}")
+    
     cursor = conn.cursor()
-    # Note: This is for demo only - in production, validate table_name to prevent SQL injection
-    cursor.execute(f"SELECT * FROM {table_name}")
+    cursor.execute(_STMT[table_name])
     return cursor.fetchall()
 
 
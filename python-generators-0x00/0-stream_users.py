@@ -5,17 +5,28 @@ This module provides a generator function to stream user data from MySQL databas
 Uses Python's yield keyword for memory-efficient data processing.
 """
 
-import mysql.connector
 from mysql.connector import Error
-import os
+from itertools import chain
+import atexit
+import threading
 
-# Load environment variables for database connection
+# Connection settings and the connector's pooled, per-thread cached
+# connections are shared with the other generator modules
+import db
+from db import CFG, get_conn, release_conn
+
+# Prefer the mysqlclient C driver when installed: it decodes rows in C and
+# is faster still than mysql.connector's C extension (which db.py uses)
+# for row-heavy streaming
 try:
-    from dotenv import load_dotenv
-    load_dotenv()
+    import MySQLdb
+    import MySQLdb.cursors
+    Error = (Error, MySQLdb.Error)
 except ImportError:
-    # dotenv not available, use default values
-    pass
+    MySQLdb = None
+
+# Default number of rows pulled from the cursor per fetch when streaming users
+STREAM_BATCH_SIZE = 1000
 
 
 def connect_to_prodev():
@@ -25,126 +36,220 @@ def connect_to_prodev():
     Returns:
         connection object to ALX_prodev database if successful, None otherwise
     """
+    if MySQLdb is None:
+        return db.connect_to_prodev()
+    
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv('MYSQL_HOST', 'localhost'),
-            database='ALX_prodev',
-            user=os.getenv('MYSQL_USER', 'root'),
-            password=os.getenv('MYSQL_PASSWORD', '')
+        return MySQLdb.connect(
+            host=CFG['host'],
+            db=CFG['database'],
+            user=CFG['user'],
+            passwd=CFG['password']
         )
-        if connection.is_connected():
-            return connection
     except Error as e:
         print(f"Error connecting to ALX_prodev database: {e}")
         return None
 
 
-def stream_users():
+def _is_mysqldb(connection):
     """
-    Generator function that streams user data from the database one row at a time.
+    Check whether a connection was opened with the mysqlclient driver
     
-    This function uses Python's yield keyword to create a generator that fetches
-    and yields database rows on-demand, providing memory-efficient access to
-    potentially large datasets.
+    Args:
+        connection: connection returned by _open_stream()
+    """
+    return MySQLdb is not None and isinstance(connection, MySQLdb.connections.Connection)
+
+
+# Per-thread cached mysqlclient connection, and whether a stream is using it
+_tls = threading.local()
+
+
+def _open_stream():
+    """
+    Get a connection for one stream: this thread's cached connection, from
+    mysqlclient when that driver is installed or from db.get_conn() otherwise
     
-    Yields:
-        dict: A dictionary containing user data with keys:
-              - user_id (str): UUID of the user
-              - name (str): User's full name  
-              - email (str): User's email address
-              - age (int): User's age
+    As with db.get_conn(), a dedicated connection is opened instead while
+    the cached one is still busy with an unfinished stream.
     
-    Example:
-        >>> for user in stream_users():
-        ...     print(user['name'])
-        ...     if some_condition:
-        ...         break  # Can stop iteration anytime
+    Returns:
+        connection object, or None if connecting failed
+    """
+    if MySQLdb is None:
+        return get_conn()
+    
+    if getattr(_tls, 'busy', False):
+        return connect_to_prodev()
+    connection = getattr(_tls, 'conn', None)
+    if connection is None or not connection.open:
+        if connection is not None:
+            # Drop the dead connection before replacing it
+            try:
+                connection.close()
+            except Error:
+                pass
+        connection = _tls.conn = connect_to_prodev()
+    _tls.busy = connection is not None
+    return connection
+
+
+def _close_stream(connection):
+    """
+    Hand back a connection obtained from _open_stream()
+    
+    The thread's cached connection stays open for the next stream; a
+    dedicated connection is closed.
+    
+    Args:
+        connection: connection returned by _open_stream()
+    """
+    if not _is_mysqldb(connection):
+        release_conn(connection)
+        return
+    if connection is getattr(_tls, 'conn', None):
+        _tls.busy = False
+        return
+    try:
+        connection.close()
+    except Error:
+        pass
+
+
+@atexit.register
+def _close_tls():
+    """Close the cached mysqlclient connection at interpreter shutdown"""
+    connection = getattr(_tls, 'conn', None)
+    if connection is not None:
+        _tls.conn = None
+        try:
+            connection.close()
+        except Error:
+            pass
+
+
+def _stream_cursor(connection, dictionary=False):
+    """
+    Create an unbuffered (server-side) cursor for either supported driver
+    
+    Args:
+        connection: connection returned by _open_stream()
+        dictionary (bool): Return rows as dictionaries instead of tuples
         
-        >>> # Get only first 5 users
-        >>> from itertools import islice
-        >>> first_five = list(islice(stream_users(), 5))
+    Returns:
+        cursor that fetches rows from the server as they are consumed
+    """
+    if _is_mysqldb(connection):
+        if dictionary:
+            return connection.cursor(MySQLdb.cursors.SSDictCursor)
+        return connection.cursor(MySQLdb.cursors.SSCursor)
+    return connection.cursor(dictionary=dictionary, buffered=False)
+
+
+def stream_users_chunks(size=STREAM_BATCH_SIZE):
+    """
+    Generator function that streams user data from the database in batches.
+    
+    Callers that consume every row anyway (e.g. to build a list) can extend
+    their results with each batch instead of resuming a generator per row.
+    
+    Args:
+        size (int): Maximum number of rows in each batch
+        
+    Yields:
+        list: Dictionaries with user_id, name, email and age keys, as
+              returned by the dictionary cursor
     
     Note:
-        - Uses only one loop as required
-        - Memory usage remains constant regardless of database size
-        - Connection is properly closed after iteration
+        - Rows are streamed from the server, so the connection stays open
+          for the whole life of the generator
+        - The thread's cached connection is reused by the next stream
         - Handles database connection errors gracefully
     """
-    # Establish database connection
-    connection = connect_to_prodev()
+    # Borrow a connection for this stream
+    connection = _open_stream()
     
     if connection is None:
         # If connection fails, yield nothing (empty generator)
         return
     
+    cursor = None
     try:
         # Create cursor for database operations
-        cursor = connection.cursor(dictionary=True)  # dictionary=True returns rows as dicts
+        # Rows come back as dicts and are streamed from the server instead
+        # of loading the whole result set up front
+        cursor = _stream_cursor(connection, dictionary=True)
+        
+        # Keep the server from timing out while a slow consumer holds the stream
+        cursor.execute("SET SESSION net_write_timeout = 3600")
         
         # Execute query to fetch all users
         # Note: We're not using LIMIT here because the generator handles streaming
-        cursor.execute("SELECT user_id, name, email, age FROM user_data")
+        cursor.execute(
+            "SELECT BIN_TO_UUID(user_id) AS user_id, name, email, age FROM user_data"
+        )
         
-        # This is the single loop required - fetch and yield one row at a time
-        for row in cursor:
-            # The yield keyword makes this function a generator
-            # Each yield pauses execution and returns one row
-            # Execution resumes from this point when the next item is requested
-            yield {
-                'user_id': row['user_id'],
-                'name': row['name'], 
-                'email': row['email'],
-                'age': row['age']
-            }
+        # Pull rows from the cursor in batches to amortize per-row fetch
+        # overhead; the dictionary cursor already returns rows with exactly
+        # the selected keys
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            
+            # Execution resumes from this point when the next batch is requested
+            yield rows
             
     except Error as e:
         print(f"Error streaming users from database: {e}")
         
     finally:
-        # Always close database connection and cursor
+        # Always close the cursor (unread rows after an early break are
+        # discarded) and hand the connection back
         if cursor:
-            cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+            try:
+                cursor.close()
+            except Error:
+                pass
+        _close_stream(connection)
 
 
-# Alternative implementation using fetchone() for even more control
-def stream_users_alternative():
-    """
-    Alternative implementation using fetchone() for maximum memory efficiency.
-    This version fetches one row at a time from the database cursor.
+def stream_users():
     """
-    connection = connect_to_prodev()
+    Generator function that streams user data from the database one row at a time.
     
-    if connection is None:
-        return
+    This function uses Python's yield keyword to create a generator that fetches
+    and yields database rows on-demand, providing memory-efficient access to
+    potentially large datasets.
     
-    try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT user_id, name, email, age FROM user_data")
-        
-        # Single loop using fetchone() - fetches one row at a time
-        while True:
-            row = cursor.fetchone()  # Fetch only one row
-            if row is None:  # No more rows
-                break
-            
-            # Yield the row as a dictionary
-            yield {
-                'user_id': row[0],
-                'name': row[1],
-                'email': row[2], 
-                'age': row[3]
-            }
-            
-    except Error as e:
-        print(f"Error streaming users from database: {e}")
+    Yields:
+        dict: A dictionary containing user data with keys:
+              - user_id (str): UUID of the user
+              - name (str): User's full name  
+              - email (str): User's email address
+              - age (int): User's age
+    
+    Example:
+        >>> for user in stream_users():
+        ...     print(user['name'])
+        ...     if some_condition:
+        ...         break  # Can stop iteration anytime
         
-    finally:
-        if cursor:
-            cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+        >>> # Get only first 5 users
+        >>> from itertools import islice
+        >>> first_five = list(islice(stream_users(), 5))
+    
+    Note:
+        - Flattens the batches produced by stream_users_chunks()
+        - Memory usage remains constant regardless of database size
+        - Rows are fetched internally in batches of STREAM_BATCH_SIZE
+        - Rows are streamed from the server, so the connection stays open
+          for the whole life of the generator
+        - Handles database connection errors gracefully
+    """
+    # chain's C iterator hands out rows from the current batch, so the
+    # fetching generator only resumes once per batch
+    yield from chain.from_iterable(stream_users_chunks())
 
 
 # Utility function to demonstrate generator usage
@@ -5,38 +5,118 @@ This module provides generators for fetching and processing database data in bat
 Implements memory-efficient batch processing with user filtering capabilities.
 """
 
-import mysql.connector
 from mysql.connector import Error
-import os
+from collections import namedtuple
+from itertools import chain
 
-# Load environment variables for database connection
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    # dotenv not available, use default values
-    pass
+# Pooled connections and the per-thread connection cache are shared with
+# the other generator modules
+from db import connect_to_prodev, get_conn, release_conn
 
+# A single user_data row; a tuple with named fields is far lighter than a
+# dict per row and still allows attribute access (user.name, user.age)
+UserRow = namedtuple('UserRow', 'user_id name email age')
 
-def connect_to_prodev():
+# Converts one (user_id, name, email, age) tuple to a UserRow by position;
+# mapped over whole batches so the per-row loop runs in C
+_make_user_row = UserRow._make
+
+# Minimum number of rows pulled from the server per network round trip in
+# stream_users_in_batches(), independent of the caller's batch size
+PREFETCH_ROWS = 1000
+
+# Users older than a given age, in user_id order (see
+# stream_users_in_batches_filtered() for the index hint)
+_FILTERED_QUERY = (
+    "SELECT /*+ INDEX(user_data PRIMARY) */ "
+    "BIN_TO_UUID(user_id) AS user_id, name, email, age "
+    "FROM user_data WHERE age > %s ORDER BY user_id"
+)
+
+
+def _stream_chunks(fetch_size, query, params=()):
     """
-    Establishes connection to the ALX_prodev database
+    Stream the raw rows of a user_data query in chunks straight off the cursor
     
-    Returns:
-        connection object to ALX_prodev database if successful, None otherwise
+    Args:
+        fetch_size (int): Number of rows pulled from the server per fetch
+        query (str): SELECT returning user_id, name, email, age columns
+        params (tuple): Parameters for the query placeholders
+        
+    Yields:
+        list: The (user_id, name, email, age) tuples of one fetch
     """
+    # Borrow this thread's cached database connection
+    connection = get_conn()
+    
+    if connection is None:
+        # If connection fails, yield nothing (empty generator)
+        return
+    
+    cursor = None
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv('MYSQL_HOST', 'localhost'),
-            database='ALX_prodev',
-            user=os.getenv('MYSQL_USER', 'root'),
-            password=os.getenv('MYSQL_PASSWORD', '')
-        )
-        if connection.is_connected():
-            return connection
+        # Create an unbuffered cursor so rows are streamed from the server
+        # (raw=False and no get_rows() call, so the driver never loads the
+        # full result set client-side)
+        cursor = connection.cursor(buffered=False)  # Returns rows as plain tuples
+        
+        # Execute query to fetch the users
+        cursor.execute(query, params)
+        
+        # LOOP 1: Chunk fetching loop
+        while True:
+            # Fetch the next chunk of fetch_size rows. The size must be
+            # passed explicitly: the C-extension cursor ignores arraysize
+            # and reads a single row without it. With a size, the whole
+            # chunk comes back from one C-level read, whereas iter(cursor)
+            # calls fetchone() once per row.
+            rows = cursor.fetchmany(fetch_size)
+            
+            # If no more rows, break the loop
+            if not rows:
+                break
+            
+            yield rows
+            
     except Error as e:
-        print(f"Error connecting to ALX_prodev database: {e}")
-        return None
+        print(f"Error streaming users in batches: {e}")
+        
+    finally:
+        # Always close the cursor (discarding any unread rows); the
+        # connection is kept for the thread's next stream
+        if cursor:
+            cursor.close()
+        release_conn(connection)
+
+
+def _stream_batches(batch_size, query, params=()):
+    """
+    Stream the rows of a user_data query as batches of UserRow tuples
+    
+    Args:
+        batch_size (int): Number of rows in each batch
+        query (str): SELECT returning user_id, name, email, age columns
+        params (tuple): Parameters for the query placeholders
+        
+    Yields:
+        list: A list of UserRow named tuples
+    """
+    # Validate batch size
+    if batch_size <= 0:
+        raise ValueError("Batch size must be a positive integer")
+    
+    # Fetch several batches per network round trip; a whole number of
+    # batches per fetch keeps every yielded batch exactly batch_size rows
+    # (except the last)
+    fetch_size = batch_size * -(-PREFETCH_ROWS // batch_size)
+    
+    for rows in _stream_chunks(fetch_size, query, params):
+        # Split the chunk into caller-sized batches
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            
+            # Wrap the tuple rows as UserRow and yield the entire batch as a list
+            yield list(map(_make_user_row, batch))
 
 
 def stream_users_in_batches(batch_size):
@@ -45,13 +125,13 @@ def stream_users_in_batches(batch_size):
     
     This function fetches database rows in configurable batch sizes, providing
     memory-efficient access to large datasets while optimizing database queries.
-    Each batch contains a list of user dictionaries.
+    Each batch contains a list of UserRow tuples.
     
     Args:
         batch_size (int): Number of rows to fetch in each batch
         
     Yields:
-        list: A list of dictionaries, each containing user data:
+        list: A list of UserRow named tuples, each containing user data:
               - user_id (str): UUID of the user
               - name (str): User's full name
               - email (str): User's email address  
@@ -61,7 +141,7 @@ def stream_users_in_batches(batch_size):
         >>> for batch in stream_users_in_batches(10):
         ...     print(f"Processing batch of {len(batch)} users")
         ...     for user in batch:
-        ...         print(f"  - {user['name']}")
+        ...         print(f"  - {user.name}")
         
         >>> # Process first 3 batches of 50 users each
         >>> from itertools import islice
@@ -70,59 +150,45 @@ def stream_users_in_batches(batch_size):
     
     Note:
         - Uses single loop as per requirements
-        - Memory usage scales with batch_size, not total dataset size
-        - Connection is properly managed and closed after streaming
+        - Memory usage scales with batch_size, not total dataset size: rows
+          are streamed from the server through an unbuffered cursor rather
+          than buffered client-side
+        - While a stream is open its connection cannot run other queries;
+          unread rows are discarded if the caller stops early
+        - The thread's connection is kept open and reused by the next stream
         - Last batch may contain fewer than batch_size records
+        - Rows are UserRow tuples: read fields as user.name, not user['name']
     """
-    # Validate batch size
-    if batch_size <= 0:
-        raise ValueError("Batch size must be a positive integer")
-    
-    # Establish database connection
-    connection = connect_to_prodev()
+    yield from _stream_batches(
+        batch_size,
+        "SELECT BIN_TO_UUID(user_id) AS user_id, name, email, age "
+        "FROM user_data ORDER BY user_id"
+    )
+
+
+def stream_users_in_batches_filtered(batch_size, min_age=25):
+    """
+    Generator function that streams users older than min_age in batches.
     
-    if connection is None:
-        # If connection fails, yield nothing (empty generator)
-        return
+    The age filter runs in MySQL, so rows that would be discarded are never
+    sent over the network or turned into Python objects. The query is hinted
+    to walk the primary key: InnoDB clusters rows on it, so that scan reads
+    every column without lookups and already returns rows in user_id order,
+    whereas a range scan on idx_user_age would need a filesort of most of
+    the table before the first row could be streamed.
     
-    try:
-        # Create cursor for database operations
-        cursor = connection.cursor(dictionary=True)  # Returns rows as dictionaries
-        
-        # Execute query to fetch all users
-        cursor.execute("SELECT user_id, name, email, age FROM user_data ORDER BY user_id")
-        
-        # LOOP 1: Batch fetching loop
-        while True:
-            # Fetch a batch of rows
-            batch = cursor.fetchmany(batch_size)
-            
-            # If no more rows, break the loop
-            if not batch:
-                break
-            
-            # Convert rows to the expected dictionary format and yield the batch
-            formatted_batch = []
-            for row in batch:  # This is part of the batch processing, not a separate loop
-                formatted_batch.append({
-                    'user_id': row['user_id'],
-                    'name': row['name'],
-                    'email': row['email'],
-                    'age': row['age']
-                })
-            
-            # Yield the entire batch as a list
-            yield formatted_batch
-            
-    except Error as e:
-        print(f"Error streaming users in batches: {e}")
+    Args:
+        batch_size (int): Number of rows to fetch in each batch
+        min_age (int): Only users strictly older than this are returned
         
-    finally:
-        # Always close database connection and cursor
-        if cursor:
-            cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+    Yields:
+        list: A list of UserRow named tuples for users with age > min_age
+    """
+    yield from _stream_batches(
+        batch_size,
+        _FILTERED_QUERY,
+        (min_age,)
+    )
 
 
 def batch_processing(batch_size):
@@ -130,15 +196,14 @@ def batch_processing(batch_size):
     Processes user data in batches and filters users over the age of 25.
     
     This function demonstrates a complete batch processing pipeline:
-    1. Fetch users in batches from database
-    2. Filter each batch to include only users over 25
-    3. Yield individual filtered users for further processing
+    1. Fetch users over 25 in batches from database
+    2. Yield individual filtered users for further processing
     
     Args:
         batch_size (int): Number of users to process in each batch
         
     Yields:
-        dict: Individual user dictionaries for users over age 25:
+        UserRow: Individual user rows for users over age 25:
               - user_id (str): UUID of the user
               - name (str): User's full name
               - email (str): User's email address
@@ -147,26 +212,30 @@ def batch_processing(batch_size):
     Example:
         >>> # Process users in batches of 50, filtering age > 25
         >>> for user in batch_processing(50):
-        ...     print(f"{user['name']} is {user['age']} years old")
+        ...     print(f"{user.name} is {user.age} years old")
         
         >>> # Count filtered users without loading all into memory
         >>> count = sum(1 for user in batch_processing(100))
         >>> print(f"Found {count} users over 25")
     
     Note:
-        - Uses total of 2 loops (within the 3-loop limit)
         - Memory usage controlled by batch_size parameter
-        - Efficiently filters large datasets without loading everything
-        - Combines batch fetching with individual result streaming
+        - The age filter runs in SQL, so only matching users are fetched
+        - Rows go from the cursor's fetched chunks straight to UserRow
+          tuples; no per-batch lists are built in between
     """
-    # LOOP 2: Process each batch from the batch generator
-    for batch in stream_users_in_batches(batch_size):
-        
-        # LOOP 3: Filter and yield individual users from current batch
-        for user in batch:
-            # Filter users over age 25
-            if user['age'] > 25:
-                yield user
+    # Validate batch size
+    if batch_size <= 0:
+        raise ValueError("Batch size must be a positive integer")
+    
+    # Flatten the fetched chunks and wrap each row as it is handed out;
+    # chain and map run the per-row loop in C, and no Python-side age
+    # check is needed
+    yield from map(_make_user_row, chain.from_iterable(_stream_chunks(
+        batch_size,
+        _FILTERED_QUERY,
+        (25,)
+    )))
 
 
 def demonstrate_batch_processing():
@@ -195,7 +264,7 @@ def demonstrate_batch_processing():
                 # Show first user in batch
                 if batch:
                     first_user = batch[0]
-                    print(f"    First user: {first_user['name']} (age {first_user['age']})")
+                    print(f"    First user: {first_user.name} (age {first_user.age})")
         
         print(f"  Total: {batch_count} batches, {user_count} users\n")
     
@@ -206,7 +275,7 @@ def demonstrate_batch_processing():
     for user in batch_processing(20):
         filtered_count += 1
         if filtered_count <= 5:  # Show first 5 filtered users
-            print(f"  {filtered_count}. {user['name']} (age {user['age']})")
+            print(f"  {filtered_count}. {user.name} (age {user.age})")
         elif filtered_count == 6:
             print("  ... (showing first 5 only)")
     
@@ -217,12 +286,19 @@ def get_batch_statistics(batch_size):
     """
     Get statistics about batch processing without loading all data
     
+    The counts and sums are computed by MySQL in a single aggregate query,
+    so no user rows are transferred; batch_size only determines how many
+    batches the users would be split into.
+    
     Args:
         batch_size (int): Batch size to use for processing
         
     Returns:
         dict: Statistics about the batch processing
     """
+    if batch_size <= 0:
+        raise ValueError("Batch size must be a positive integer")
+    
     stats = {
         'total_batches': 0,
         'total_users': 0,
@@ -231,20 +307,41 @@ def get_batch_statistics(batch_size):
         'age_sum': 0
     }
     
-    # Process in batches to get statistics
-    for batch in stream_users_in_batches(batch_size):
-        stats['total_batches'] += 1
-        stats['total_users'] += len(batch)
+    connection = connect_to_prodev()
+    
+    if connection is None:
+        return stats
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT COUNT(*),
+                   COALESCE(SUM(age), 0),
+                   COALESCE(SUM(CASE WHEN age > 25 THEN 1 ELSE 0 END), 0)
+            FROM user_data
+        """)
+        total_users, age_sum, filtered_users = cursor.fetchone()
         
-        # Calculate statistics for this batch
-        for user in batch:
-            stats['age_sum'] += user['age']
-            if user['age'] > 25:
-                stats['filtered_users'] += 1
+        stats['total_users'] = total_users
+        stats['total_batches'] = -(-total_users // batch_size)
+        stats['filtered_users'] = int(filtered_users)
+        stats['age_sum'] = int(age_sum)
+        
+        # Calculate average age
+        if total_users > 0:
+            stats['average_age'] = stats['age_sum'] / total_users
     
-    # Calculate average age
-    if stats['total_users'] > 0:
-        stats['average_age'] = stats['age_sum'] / stats['total_users']
+    except Error as e:
+        print(f"Error computing batch statistics: {e}")
+    
+    finally:
+        if cursor:
+            cursor.close()
+        try:
+            connection.close()
+        except Error:
+            pass
     
     return stats
 
@@ -252,27 +349,35 @@ def get_batch_statistics(batch_size):
 # Alternative implementation using different approach
 def stream_users_in_batches_alternative(batch_size):
     """
-    Alternative implementation using LIMIT and OFFSET for batch fetching.
-    This approach is useful when you need to restart from specific positions.
+    Alternative implementation using keyset pagination for batch fetching.
+    Each batch seeks past the last user_id of the previous one, so deep
+    batches cost no more than the first (unlike LIMIT/OFFSET). This approach
+    is useful when you need to restart from specific positions.
+    
+    The batch query is prepared on the server once and only its parameters
+    are sent for each batch. Batches are lists of UserRow tuples, as in
+    stream_users_in_batches().
     """
     connection = connect_to_prodev()
     
     if connection is None:
         return
     
+    cursor = None
     try:
-        cursor = connection.cursor(dictionary=True)
-        offset = 0
+        cursor = connection.cursor(prepared=True)
+        last_id = ''  # Every user_id sorts after ''
         
-        # Loop to fetch batches using LIMIT and OFFSET
+        # Loop to fetch batches seeking past the last seen user_id
         while True:
-            # Fetch batch using LIMIT and OFFSET
+            # Fetch batch using LIMIT and the last seen key
             cursor.execute(
-                "SELECT user_id, name, email, age FROM user_data ORDER BY user_id LIMIT %s OFFSET %s",
-                (batch_size, offset)
+                "SELECT BIN_TO_UUID(user_id) AS user_id, name, email, age FROM user_data "
+                "WHERE user_id > UNHEX(REPLACE(%s, '-', '')) ORDER BY user_id LIMIT %s",
+                (last_id, batch_size)
             )
             
-            batch = cursor.fetchall()
+            batch = list(map(_make_user_row, cursor.fetchall()))
             
             # If no more rows, break
             if not batch:
@@ -281,8 +386,8 @@ def stream_users_in_batches_alternative(batch_size):
             # Yield the batch
             yield batch
             
-            # Move offset for next batch
-            offset += batch_size
+            # Remember where this batch ended for the next one
+            last_id = batch[-1].user_id
             
             # If batch is smaller than batch_size, we've reached the end
             if len(batch) < batch_size:
@@ -294,8 +399,10 @@ def stream_users_in_batches_alternative(batch_size):
     finally:
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
+        try:
             connection.close()
+        except Error:
+            pass
 
 
 if __name__ == "__main__":
@@ -321,7 +428,7 @@ if __name__ == "__main__":
     # Test filtered processing
     for i, user in enumerate(batch_processing(10)):
         if i < 5:  # Show first 5 filtered users
-            print(f"{i+1}. {user['name']} (age {user['age']})")
+            print(f"{i+1}. {user.name} (age {user.age})")
         elif i == 5:
             print("... (showing first 5 only)")
             break
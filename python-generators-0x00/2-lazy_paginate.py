@@ -5,58 +5,44 @@ This module provides generators for lazily loading paginated data from the datab
 Implements memory-efficient pagination that fetches pages only when needed.
 """
 
-import mysql.connector
 from mysql.connector import Error
-import os
+from concurrent.futures import ThreadPoolExecutor
 
-# Import seed module for database connection
-try:
-    import seed
-except ImportError:
-    print("Warning: seed module not found. Make sure seed.py is in the same directory.")
-    seed = None
+# Pooled connections and the per-thread connection cache are shared with
+# the other generator modules
+from db import CFG, connect_to_prodev, get_conn, release_conn
 
-# Load environment variables for database connection
+# aiomysql is only needed for the async pagination API
 try:
-    from dotenv import load_dotenv
-    load_dotenv()
+    import aiomysql
 except ImportError:
-    # dotenv not available, use default values
-    pass
-
+    aiomysql = None
 
-def connect_to_prodev():
-    """
-    Establishes connection to the ALX_prodev database
-    
-    Returns:
-        connection object to ALX_prodev database if successful, None otherwise
-    """
-    try:
-        connection = mysql.connector.connect(
-            host=os.getenv('MYSQL_HOST', 'localhost'),
-            database='ALX_prodev',
-            user=os.getenv('MYSQL_USER', 'root'),
-            password=os.getenv('MYSQL_PASSWORD', '')
-        )
-        if connection.is_connected():
-            return connection
-    except Error as e:
-        print(f"Error connecting to ALX_prodev database: {e}")
-        return None
+# Keyset page query: the page of users following a given user_id
+# ORDER BY user_id ensures consistent pagination across calls. user_id is
+# stored as BINARY(16): the UUID text is converted back to its bytes for the
+# comparison ('' becomes an empty key that sorts first) and every row's
+# user_id is returned as text
+PAGE_QUERY = (
+    "SELECT BIN_TO_UUID(user_id) AS user_id, name, email, age FROM user_data "
+    "WHERE user_id > UNHEX(REPLACE(%s, '-', '')) ORDER BY user_id LIMIT %s"
+)
 
 
-def paginate_users(page_size, offset):
+def paginate_users(page_size, last_id=''):
     """
-    Fetch a single page of users from the database using LIMIT and OFFSET.
+    Fetch a single page of users from the database using keyset pagination.
     
-    This function implements traditional pagination by fetching a specific page
-    of results from the database. It's used by the lazy pagination generator
-    to fetch individual pages on demand.
+    This function fetches the page of users that follows the given user_id
+    in user_id order. Seeking past the last seen key uses the primary key
+    index directly, so every page costs the same no matter how deep it is,
+    unlike OFFSET which scans and discards all the skipped rows. It's used
+    by the lazy pagination generator to fetch individual pages on demand.
     
     Args:
         page_size (int): Number of users to fetch per page
-        offset (int): Number of records to skip (page_size * page_number)
+        last_id (str): user_id of the last user on the previous page
+                       ('' for the first page)
         
     Returns:
         list: List of user dictionaries for the requested page:
@@ -67,63 +53,47 @@ def paginate_users(page_size, offset):
               
     Example:
         >>> # Get first page (page 0)
-        >>> page_1 = paginate_users(10, 0)  # First 10 users
+        >>> page_1 = paginate_users(10)  # First 10 users
         >>> 
         >>> # Get second page (page 1)
-        >>> page_2 = paginate_users(10, 10)  # Next 10 users
+        >>> page_2 = paginate_users(10, page_1[-1]['user_id'])  # Next 10 users
         >>> 
         >>> # Get third page (page 2)
-        >>> page_3 = paginate_users(10, 20)  # Users 21-30
+        >>> page_3 = paginate_users(10, page_2[-1]['user_id'])  # Users 21-30
     
     Note:
         - Uses LIMIT for page size control
-        - Uses OFFSET for page positioning
+        - Uses the last seen user_id for page positioning
         - Returns empty list if no more data available
-        - Properly closes database connection after fetch
+        - Reuses the calling thread's connection across calls
     """
-    # Use seed module connection if available, otherwise use local connection
-    if seed and hasattr(seed, 'connect_to_prodev'):
-        connection = seed.connect_to_prodev()
-    else:
-        connection = connect_to_prodev()
+    # Reuse this thread's cached connection
+    connection = get_conn()
     
     if connection is None:
         print("Error: Could not establish database connection")
         return []
     
+    cursor = None
     try:
         cursor = connection.cursor(dictionary=True)
         
-        # Execute paginated query with LIMIT and OFFSET
-        # ORDER BY user_id ensures consistent pagination across calls
-        query = "SELECT user_id, name, email, age FROM user_data ORDER BY user_id LIMIT %s OFFSET %s"
-        cursor.execute(query, (page_size, offset))
-        
-        # Fetch all rows for this page
-        rows = cursor.fetchall()
+        # Execute paginated query seeking past the last seen user_id
+        cursor.execute(PAGE_QUERY, (last_id, page_size))
         
-        # Convert to list of dictionaries (if not already)
-        result = []
-        for row in rows:
-            result.append({
-                'user_id': row['user_id'],
-                'name': row['name'],
-                'email': row['email'],
-                'age': row['age']
-            })
-        
-        return result
+        # Fetch all rows for this page; the dictionary cursor already
+        # returns them as dicts keyed by the selected columns
+        return cursor.fetchall()
         
     except Error as e:
         print(f"Error fetching paginated users: {e}")
         return []
         
     finally:
-        # Always close the connection
+        # Always close the cursor; the connection is kept for the next page
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+        release_conn(connection)
 
 
 def lazy_paginate(page_size):
@@ -131,7 +101,7 @@ def lazy_paginate(page_size):
     Generator function that lazily loads pages of user data on demand.
     
     This function implements lazy pagination by yielding pages only when
-    requested. It maintains internal state to track the current offset
+    requested. It maintains internal state to track the last user_id seen
     and automatically fetches the next page when the iterator continues.
     
     Args:
@@ -164,46 +134,171 @@ def lazy_paginate(page_size):
     
     Note:
         - Uses only ONE loop as required
-        - Memory usage is constant (only one page loaded at a time)
+        - Memory usage is constant (at most two pages loaded at a time)
         - Stops automatically when no more data is available
-        - Tracks offset internally across iterations
-        - Each page is fetched on-demand, not pre-loaded
+        - Tracks the last user_id internally across iterations
+        - The next page is fetched in the background while the caller
+          processes the current one; nothing beyond that is pre-loaded
+        - One connection and cursor are reused for every page
     """
     # Validate page size
     if page_size <= 0:
         raise ValueError("Page size must be a positive integer")
     
-    # Initialize pagination state
-    offset = 0  # Start at the beginning (page 0)
+    # Open a single connection for the whole scan rather than one per page
+    connection = connect_to_prodev()
     
-    # SINGLE LOOP: Continue until no more pages are available
-    while True:
-        # Fetch the current page using the paginate_users function
-        # This is the lazy part - page is only fetched when needed
-        page = paginate_users(page_size, offset)
-        
-        # If page is empty, we've reached the end of data
-        if not page:
-            break
-        
-        # Yield the current page to the caller
-        # Execution pauses here until the next page is requested
-        yield page
+    if connection is None:
+        print("Error: Could not establish database connection")
+        return
+    
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
         
-        # Update offset for the next page
-        # This maintains pagination state across yields
-        offset += page_size
+        def fetch_page(last_id):
+            """Fetch the page following last_id on the shared cursor"""
+            cursor.execute(PAGE_QUERY, (last_id, page_size))
+            return cursor.fetchall()
         
-        # If page is smaller than page_size, it's the last page
-        # We can break here for efficiency (optional optimization)
-        if len(page) < page_size:
-            break
+        # A single worker thread runs every query, one at a time, so the
+        # connection is never used concurrently. Leaving the with block
+        # waits for any in-flight prefetch before the cursor is closed.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Start at the beginning (every user_id sorts after '')
+            next_page = executor.submit(fetch_page, '')
+            
+            # SINGLE LOOP: Continue until no more pages are available
+            while True:
+                # Wait for the page (usually already fetched in the background)
+                page = next_page.result()
+                
+                # If page is empty, we've reached the end of data
+                if not page:
+                    break
+                
+                # A full page may be followed by more data: start fetching the
+                # next page from where this one ended before handing this one
+                # over, so the query overlaps with the caller's processing
+                if len(page) == page_size:
+                    next_page = executor.submit(fetch_page, page[-1]['user_id'])
+                else:
+                    next_page = None
+                
+                # Yield the current page to the caller
+                # Execution pauses here until the next page is requested
+                yield page
+                
+                # If page is smaller than page_size, it's the last page
+                if next_page is None:
+                    break
+    
+    except Error as e:
+        print(f"Error fetching paginated users: {e}")
+    
+    finally:
+        # Always close the cursor and connection, even on early exit
+        if cursor:
+            cursor.close()
+        try:
+            connection.close()
+        except Error:
+            pass
 
 
 # Alternative name for compatibility with test script
 lazy_pagination = lazy_paginate
 
 
+async def create_async_pool(minsize=2, maxsize=10):
+    """
+    Create an aiomysql connection pool for the ALX_prodev database
+    
+    Args:
+        minsize (int): Connections opened up front
+        maxsize (int): Upper bound on concurrently open connections
+        
+    Returns:
+        aiomysql.Pool: pool to pass to lazy_paginate_async()
+        
+    Raises:
+        ImportError: If aiomysql is not installed
+    """
+    if aiomysql is None:
+        raise ImportError("aiomysql is required for async pagination: pip install aiomysql")
+    
+    return await aiomysql.create_pool(
+        host=CFG['host'],
+        db=CFG['database'],
+        user=CFG['user'],
+        password=CFG['password'],
+        minsize=minsize,
+        maxsize=maxsize,
+        autocommit=True
+    )
+
+
+async def lazy_paginate_async(page_size, pool=None):
+    """
+    Async generator version of lazy_paginate().
+    
+    While a page query is waiting on MySQL, the event loop is free to run
+    other coroutines, so several consumers sharing one pool can have their
+    queries in flight at the same time instead of waiting on each other.
+    
+    Args:
+        page_size (int): Number of users per page
+        pool (aiomysql.Pool): Pool from create_async_pool(); when omitted a
+                              private pool is created and closed afterwards
+        
+    Yields:
+        list: A list of user dictionaries for each page, as in lazy_paginate()
+        
+    Example:
+        >>> async def main():
+        ...     pool = await create_async_pool()
+        ...     async for page in lazy_paginate_async(10, pool):
+        ...         print(f"Processing page with {len(page)} users")
+        ...     pool.close()
+        ...     await pool.wait_closed()
+    """
+    # Validate page size
+    if page_size <= 0:
+        raise ValueError("Page size must be a positive integer")
+    
+    own_pool = pool is None
+    if own_pool:
+        pool = await create_async_pool()
+    
+    try:
+        async with pool.acquire() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                # Start at the beginning (every user_id sorts after '')
+                last_id = ''
+                
+                while True:
+                    await cursor.execute(PAGE_QUERY, (last_id, page_size))
+                    page = await cursor.fetchall()
+                    
+                    # If page is empty, we've reached the end of data
+                    if not page:
+                        break
+                    
+                    yield page
+                    
+                    # Remember where this page ended for the next page
+                    last_id = page[-1]['user_id']
+                    
+                    # If page is smaller than page_size, it's the last page
+                    if len(page) < page_size:
+                        break
+    
+    finally:
+        if own_pool:
+            pool.close()
+            await pool.wait_closed()
+
+
 def demonstrate_lazy_pagination():
     """
     Demonstrates the benefits and usage of lazy pagination
@@ -244,12 +339,18 @@ def pagination_statistics(page_size):
     """
     Generate statistics about pagination without loading all data into memory
     
+    Only the user count is fetched (one COUNT(*) query); the page figures
+    follow from it arithmetically.
+    
     Args:
         page_size (int): Size of each page
         
     Returns:
         dict: Statistics about the paginated data
     """
+    if page_size <= 0:
+        raise ValueError("Page size must be a positive integer")
+    
     stats = {
         'total_pages': 0,
         'total_users': 0,
@@ -257,17 +358,36 @@ def pagination_statistics(page_size):
         'last_page_size': 0
     }
     
-    total_size = 0
+    connection = connect_to_prodev()
+    
+    if connection is None:
+        print("Error: Could not establish database connection")
+        return stats
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        total_users = cursor.fetchone()[0]
+    
+    except Error as e:
+        print(f"Error computing pagination statistics: {e}")
+        return stats
     
-    for page in lazy_paginate(page_size):
-        stats['total_pages'] += 1
-        page_size_actual = len(page)
-        stats['total_users'] += page_size_actual
-        total_size += page_size_actual
-        stats['last_page_size'] = page_size_actual
+    finally:
+        if cursor:
+            cursor.close()
+        try:
+            connection.close()
+        except Error:
+            pass
     
-    if stats['total_pages'] > 0:
-        stats['average_page_size'] = total_size / stats['total_pages']
+    if total_users > 0:
+        total_pages = -(-total_users // page_size)
+        stats['total_pages'] = total_pages
+        stats['total_users'] = total_users
+        stats['average_page_size'] = total_users / total_pages
+        stats['last_page_size'] = total_users - (total_pages - 1) * page_size
     
     return stats
 
@@ -349,8 +469,8 @@ if __name__ == "__main__":
     print("=" * 60)
     
     # Test basic pagination function
-    print("📋 Testing paginate_users(5, 0):")
-    first_page = paginate_users(5, 0)
+    print("📋 Testing paginate_users(5):")
+    first_page = paginate_users(5)
     print(f"First page contains {len(first_page)} users")
     
     if first_page:
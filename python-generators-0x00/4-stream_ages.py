@@ -5,41 +5,105 @@ This module provides generators for streaming user ages and computing
 memory-efficient aggregate statistics without loading entire datasets.
 """
 
-import mysql.connector
 from mysql.connector import Error
 import os
+from collections import Counter, deque
+from itertools import accumulate, chain
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 
-# Load environment variables for database connection
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    # dotenv not available, use default values
-    pass
+# Connections come from the pool shared with the other generator modules
+from db import connect_to_prodev
 
+# Number of ages pulled from the server per fetch in stream_user_age_chunks()
+AGE_FETCH_SIZE = 10000
 
-def connect_to_prodev():
+# Compress the protocol for the age stream: a full scan sends long runs of
+# small, repetitive values, so it shrinks well on the wire. Off by default,
+# since a compressed stream needs a dedicated connection instead of a pooled
+# one; set MYSQL_COMPRESS=1 when MySQL sits behind a slow network link
+AGE_STREAM_COMPRESS = os.getenv('MYSQL_COMPRESS', '0') == '1'
+
+
+def stream_user_age_chunks(order_by_id=False):
     """
-    Establishes connection to the ALX_prodev database
+    Generator function that streams user ages from the database in chunks.
     
-    Returns:
-        connection object to ALX_prodev database if successful, None otherwise
+    Aggregations can fold each chunk with C-level built-ins (sum, min, max,
+    Counter) instead of running Python code for every age.
+    
+    Args:
+        order_by_id (bool): Yield ages in user_id order (see stream_user_ages())
+    
+    Yields:
+        list: Up to AGE_FETCH_SIZE ages (ints) per chunk
+    
+    Note:
+        - The next chunk is fetched in the background while the caller
+          processes the current one; nothing beyond that is read ahead
     """
+    # Establish database connection
+    connection = connect_to_prodev(compress=AGE_STREAM_COMPRESS)
+    
+    if connection is None:
+        # If connection fails, yield nothing (empty generator)
+        return
+    
+    cursor = None
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv('MYSQL_HOST', 'localhost'),
-            database='ALX_prodev',
-            user=os.getenv('MYSQL_USER', 'root'),
-            password=os.getenv('MYSQL_PASSWORD', '')
-        )
-        if connection.is_connected():
-            return connection
+        # Create an unbuffered cursor so rows are streamed from the server;
+        # age is a TINYINT, which the C extension decodes straight to int
+        cursor = connection.cursor(buffered=False)
+        
+        # Execute query to fetch only ages (minimizes data transfer)
+        # ORDER BY is only added when the caller needs a consistent order
+        query = "SELECT age FROM user_data"
+        if order_by_id:
+            query += " ORDER BY user_id"
+        cursor.execute(query)
+        
+        def fetch_chunk():
+            """Fetch the next chunk of ages as ints ([] at the end)"""
+            # Each row is a 1-tuple, so flattening the rows gives the age
+            # values directly
+            return list(chain.from_iterable(cursor.fetchmany(AGE_FETCH_SIZE)))
+        
+        # A single worker thread runs every fetch, one at a time, so the
+        # cursor is never used concurrently and at most one chunk is read
+        # ahead. Leaving the with block waits for any in-flight fetch
+        # before the cursor is closed.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_chunk = executor.submit(fetch_chunk)
+            
+            # LOOP 1: Stream ages from the database in large chunks
+            # This is our first and primary loop for streaming data
+            while True:
+                # Wait for the chunk (usually already fetched in the background)
+                chunk = next_chunk.result()
+                if not chunk:
+                    break
+                
+                # Start reading the next chunk before handing this one over,
+                # so the network read overlaps with the caller's processing
+                next_chunk = executor.submit(fetch_chunk)
+                yield chunk
+            
     except Error as e:
-        print(f"Error connecting to ALX_prodev database: {e}")
-        return None
+        print(f"Error streaming user ages: {e}")
+        
+    finally:
+        # Always close database connection and cursor; the connection is
+        # closed straight away rather than pinged with is_connected() first
+        # (a broken connection just raises, which is ignored)
+        if cursor:
+            cursor.close()
+        try:
+            connection.close()
+        except Error:
+            pass
 
 
-def stream_user_ages():
+def stream_user_ages(order_by_id=False):
     """
     Generator function that streams user ages from the database one by one.
     
@@ -47,81 +111,102 @@ def stream_user_ages():
     ages rather than loading all ages into memory. It enables processing of
     arbitrarily large datasets with constant memory usage.
     
+    Args:
+        order_by_id (bool): Yield ages in user_id order. Sums, counts and
+                            extremes do not depend on order, so by default
+                            MySQL is free to scan whichever way is cheapest
+                            (e.g. just the idx_user_age index)
+    
     Yields:
         int: Individual user age from the database
         
     Example:
-        >>> # Calculate average age without loading all data
-        >>> total = 0
-        >>> count = 0
-        >>> for age in stream_user_ages():
-        ...     total += age
-        ...     count += 1
-        >>> average = total / count if count > 0 else 0
+        >>> # Total age of adults without loading all data; sum() runs the
+        >>> # loop in C instead of a Python for-body per age
+        >>> adult_total = sum(age for age in stream_user_ages() if age >= 18)
         
         >>> # Find maximum age efficiently
-        >>> max_age = 0
-        >>> for age in stream_user_ages():
-        ...     if age > max_age:
-        ...         max_age = age
+        >>> max_age = max(stream_user_ages(), default=0)
         
-        >>> # Count users in age ranges
-        >>> age_groups = {'young': 0, 'middle': 0, 'senior': 0}
-        >>> for age in stream_user_ages():
-        ...     if age < 30:
-        ...         age_groups['young'] += 1
-        ...     elif age < 60:
-        ...         age_groups['middle'] += 1
-        ...     else:
-        ...         age_groups['senior'] += 1
+        >>> # Count users in age ranges: Counter tallies the ages in C, then
+        >>> # only the ~150 distinct ages are bucketed (bisect, no if/elif)
+        >>> from bisect import bisect
+        >>> groups = ('young', 'middle', 'senior')
+        >>> age_groups = Counter()
+        >>> for age, n in Counter(stream_user_ages()).items():
+        ...     age_groups[groups[bisect([30, 60], age)]] += n
     
     Note:
-        - Uses single database query with streaming cursor
+        - Flattens the chunks produced by stream_user_age_chunks()
+        - Ages are fetched AGE_FETCH_SIZE rows at a time
         - Memory usage remains constant regardless of dataset size
-        - Processes ages in database order (typically by user_id)
+        - Ages arrive in no particular order unless order_by_id is set
+        - Every call re-runs the query and reads the whole table again; to
+          compute several statistics, use one pass (see
+          run_all_aggregations()) rather than one stream per statistic
         - Connection properly closed after streaming completes
         - Handles database errors gracefully
     """
-    # Establish database connection
+    # Flatten the fetched chunks; chain hands out the ages of the current
+    # chunk in C, so the fetching generator only resumes once per chunk
+    yield from chain.from_iterable(stream_user_age_chunks(order_by_id))
+
+
+def _fetch_all(query, params=()):
+    """
+    Run a small query (e.g. an aggregate) and return all of its rows
+    
+    Args:
+        query (str): SELECT returning a handful of rows
+        params (tuple): Parameters for the query placeholders
+        
+    Returns:
+        list: The result rows, or None if the query failed
+    """
     connection = connect_to_prodev()
     
     if connection is None:
-        # If connection fails, yield nothing (empty generator)
-        return
+        return None
     
+    cursor = None
     try:
-        # Create cursor for database operations
         cursor = connection.cursor()
+        cursor.execute(query, params)
+        return cursor.fetchall()
         
-        # Execute query to fetch only ages (minimizes data transfer)
-        # ORDER BY ensures consistent streaming order
-        cursor.execute("SELECT age FROM user_data ORDER BY user_id")
-        
-        # LOOP 1: Stream ages one by one from database
-        # This is our first and primary loop for streaming data
-        for (age,) in cursor:
-            # Yield individual age value
-            # The comma in (age,) unpacks the tuple returned by cursor
-            yield age
-            
     except Error as e:
-        print(f"Error streaming user ages: {e}")
+        print(f"Error running aggregate query: {e}")
+        return None
         
     finally:
-        # Always close database connection and cursor
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
+        try:
             connection.close()
+        except Error:
+            pass
+
+
+def _fetch_one(query):
+    """
+    Run a single-row query (e.g. an aggregate) and return its row
+    
+    Args:
+        query (str): SELECT returning exactly one row
+        
+    Returns:
+        tuple: The result row, or None if the query failed
+    """
+    rows = _fetch_all(query)
+    return rows[0] if rows else None
 
 
 def calculate_average_age():
     """
-    Calculate average age using memory-efficient streaming.
+    Calculate the average age of all users.
     
-    This function demonstrates how to compute aggregate statistics using
-    generators without loading the entire dataset into memory. It uses
-    an online algorithm to maintain running totals.
+    MySQL computes the average and returns a single row, so no ages are
+    sent over the network or turned into Python objects.
     
     Returns:
         float: Average age of all users, or 0 if no users exist
@@ -132,81 +217,53 @@ def calculate_average_age():
         
     Note:
         - Uses O(1) memory regardless of dataset size
-        - Processes each age exactly once (single pass)
-        - Handles empty dataset gracefully
-        - Uses online algorithm for running average calculation
+        - Handles empty dataset gracefully (AVG of no rows is NULL)
+        - stream_user_ages() remains available for row-by-row processing
     """
-    # Initialize aggregation variables
-    total_age = 0      # Running sum of all ages
-    user_count = 0     # Running count of users processed
-    
-    # LOOP 2: Process each streamed age for aggregation
-    # This is our second loop for computing the aggregate
-    for age in stream_user_ages():
-        total_age += age    # Add current age to running total
-        user_count += 1     # Increment user counter
-    
-    # Calculate and return average
-    # Handle division by zero for empty dataset
-    if user_count > 0:
-        return total_age / user_count
-    else:
+    row = _fetch_one("SELECT AVG(age) FROM user_data")
+    
+    # Handle missing result or empty dataset
+    if row is None or row[0] is None:
         return 0.0
+    return float(row[0])
+
+
+# Age groups reported by demonstrate_streaming_aggregation(), with the SQL
+# condition counting each one
+AGE_GROUPS = {
+    'teens': 'age < 20',
+    'twenties': 'age >= 20 AND age < 30',
+    'thirties': 'age >= 30 AND age < 40',
+    'forties': 'age >= 40 AND age < 50',
+    'seniors': 'age >= 50'
+}
 
 
 def demonstrate_streaming_aggregation():
     """
-    Demonstrate various streaming aggregation techniques
+    Demonstrate various aggregation techniques
+    
+    Every statistic and age group count is computed by MySQL in one query
+    that returns a single row.
     """
     print("🔍 Memory-Efficient Aggregation Demonstration")
     print("=" * 55)
     
-    # Demonstrate basic statistics without loading all data
-    print("📊 Computing statistics using streaming:")
-    
-    # Initialize counters for various statistics
-    total_age = 0
-    count = 0
-    min_age = float('inf')
-    max_age = 0
-    age_sum_squares = 0  # For standard deviation
-    
-    # Age group counters
-    age_groups = {
-        'teens': 0,      # < 20
-        'twenties': 0,   # 20-29
-        'thirties': 0,   # 30-39
-        'forties': 0,    # 40-49
-        'seniors': 0     # 50+
-    }
+    print("📊 Computing statistics in the database:")
     
-    # Single pass through data to compute multiple statistics
-    print("  Processing ages stream...")
-    for age in stream_user_ages():
-        # Basic statistics
-        total_age += age
-        count += 1
-        min_age = min(min_age, age)
-        max_age = max(max_age, age)
-        age_sum_squares += age * age
-        
-        # Age group classification
-        if age < 20:
-            age_groups['teens'] += 1
-        elif age < 30:
-            age_groups['twenties'] += 1
-        elif age < 40:
-            age_groups['thirties'] += 1
-        elif age < 50:
-            age_groups['forties'] += 1
-        else:
-            age_groups['seniors'] += 1
-    
-    # Calculate derived statistics
-    if count > 0:
-        average_age = total_age / count
-        variance = (age_sum_squares / count) - (average_age ** 2)
-        std_deviation = variance ** 0.5
+    # One aggregate query: count, average, extremes, standard deviation and
+    # one conditional count per age group
+    row = _fetch_one(
+        "SELECT COUNT(*), AVG(age), MIN(age), MAX(age), STDDEV_POP(age), "
+        + ", ".join(
+            f"COALESCE(SUM({condition}), 0)" for condition in AGE_GROUPS.values()
+        )
+        + " FROM user_data"
+    )
+    
+    if row is not None and row[0] > 0:
+        count, average_age, min_age, max_age, std_deviation = row[:5]
+        age_groups = dict(zip(AGE_GROUPS, row[5:]))
         
         print(f"\n📈 Computed Statistics:")
         print(f"  Total users: {count}")
@@ -223,48 +280,111 @@ def demonstrate_streaming_aggregation():
         print("  No users found in database")
 
 
+def run_all_aggregations(window_size=100, window_users=300):
+    """
+    Feed every streaming aggregate from a single scan of the ages.
+    
+    advanced_streaming_patterns() used to re-run the age query and read the
+    whole table again for each pattern; this computes the order-independent
+    numbers for all of them in one pass. The moving average depends on row
+    order, so its leading users are fetched separately, ordered by user_id.
+    
+    Args:
+        window_size (int): Ages in the moving average window
+        window_users (int): Moving averages are computed over this many
+                            leading users (by user_id) only
+        
+    Returns:
+        dict: Aggregates keyed by name:
+              - moving_average: last moving average (None if fewer than
+                10 users)
+              - moving_average_count: number of moving averages computed
+              - adult_total, adult_count, minor_count: adults-only split
+    """
+    # Moving average window and its running sum
+    window = deque(maxlen=window_size)
+    window_total = 0
+    moving_average = None
+    moving_average_count = 0
+    
+    # Conditional aggregation (adults only)
+    adult_total = 0
+    adult_count = 0
+    minor_count = 0
+    
+    # Moving average over the leading users, in a stable (user_id) order;
+    # only window_users rows are read, so this stays a small query
+    leading_rows = _fetch_all(
+        "SELECT age FROM user_data ORDER BY user_id LIMIT %s",
+        (window_users,)
+    ) or []
+    for (age,) in leading_rows:
+        if len(window) == window_size:
+            window_total -= window[0]
+        window.append(age)
+        window_total += age
+        
+        if len(window) >= 10:  # Start calculating after 10 values
+            moving_average = window_total / len(window)
+            moving_average_count += 1
+    
+    # SINGLE PASS: fold each streamed chunk into the adults-only split
+    # (order does not matter here, so the scan is left unordered)
+    for chunk in stream_user_age_chunks():
+        # Only ~150 distinct ages exist: count them in C, then fold the
+        # per-age counts into the adults-only split instead of touching
+        # every row in Python
+        for age, n in Counter(chunk).items():
+            if age >= 18:
+                adult_total += age * n
+                adult_count += n
+            else:
+                minor_count += n
+    
+    return {
+        'moving_average': moving_average,
+        'moving_average_count': moving_average_count,
+        'adult_total': adult_total,
+        'adult_count': adult_count,
+        'minor_count': minor_count
+    }
+
+
 def streaming_percentiles(percentiles=[25, 50, 75, 90, 95]):
     """
-    Calculate percentiles using streaming with minimal memory usage.
+    Calculate exact percentiles with minimal memory usage.
     
-    Note: This approach uses a sampling method for large datasets.
-    For exact percentiles, you'd need to store all values or use
-    specialized algorithms like P² or T-Digest.
+    MySQL has no PERCENTILE_CONT, but ages take only ~150 distinct values:
+    the server groups the ages (reading just the idx_user_age index) and
+    returns one (age, count) row per value, and the percentiles are read
+    off the cumulative counts. No per-user rows are transferred and no
+    sampling is needed.
     
     Args:
         percentiles (list): List of percentiles to calculate
         
     Returns:
-        dict: Dictionary mapping percentile to estimated value
+        dict: Dictionary mapping percentile to its value
     """
-    print(f"\n📊 Streaming Percentile Estimation")
+    print(f"\n📊 Streaming Percentile Calculation")
     print("=" * 35)
     
-    # Collect a sample for percentile estimation
-    # In production, you'd use more sophisticated streaming algorithms
-    sample_ages = []
-    sample_size = 1000  # Limit sample size for memory efficiency
-    
-    count = 0
-    for age in stream_user_ages():
-        if len(sample_ages) < sample_size:
-            sample_ages.append(age)
-        else:
-            # Random sampling to maintain representative sample
-            import random
-            if random.random() < (sample_size / count):
-                sample_ages[random.randint(0, sample_size - 1)] = age
-        count += 1
-    
-    if sample_ages:
-        sample_ages.sort()
+    # Age histogram in ascending age order
+    histogram = _fetch_all("SELECT age, COUNT(*) FROM user_data GROUP BY age ORDER BY age")
+    
+    if histogram:
+        ages = [int(age) for age, _ in histogram]
+        # cumulative[i] = number of users aged ages[i] or younger
+        cumulative = list(accumulate(n for _, n in histogram))
+        total = cumulative[-1]
         result = {}
         
-        print(f"  Estimated percentiles (based on sample of {len(sample_ages)} users):")
+        print(f"  Percentiles (exact, over all {total} users):")
         for p in percentiles:
-            index = int((p / 100) * (len(sample_ages) - 1))
-            result[p] = sample_ages[index]
-            print(f"    {p}th percentile: {sample_ages[index]}")
+            # Age of the user at this rank in age order
+            index = int((p / 100) * (total - 1))
+            result[p] = ages[bisect_right(cumulative, index)]
+            print(f"    {p}th percentile: {result[p]}")
         
         return result
     else:
@@ -295,55 +415,35 @@ def compare_memory_usage():
     print("  Scalability: Can process unlimited users")
 
 
-def advanced_streaming_patterns():
+def advanced_streaming_patterns(aggregates=None):
     """
     Demonstrate advanced streaming aggregation patterns
+    
+    Args:
+        aggregates (dict): Result of run_all_aggregations() to reuse; a new
+                           scan is run when omitted
     """
     print(f"\n🔧 Advanced Streaming Patterns")
     print("=" * 35)
     
+    if aggregates is None:
+        aggregates = run_all_aggregations()
+    
     # Pattern 1: Moving average (last N values)
     print("1. Moving Average (last 100 users):")
-    from collections import deque
-    
-    window_size = 100
-    window = deque(maxlen=window_size)
-    moving_averages = []
-    
-    count = 0
-    for age in stream_user_ages():
-        window.append(age)
-        count += 1
-        
-        if len(window) >= 10:  # Start calculating after 10 values
-            moving_avg = sum(window) / len(window)
-            moving_averages.append(moving_avg)
-        
-        # Stop after reasonable sample for demo
-        if count >= 300:
-            break
     
-    if moving_averages:
-        print(f"   Final moving average: {moving_averages[-1]:.2f}")
-        print(f"   Computed {len(moving_averages)} moving averages")
+    if aggregates['moving_average'] is not None:
+        print(f"   Final moving average: {aggregates['moving_average']:.2f}")
+        print(f"   Computed {aggregates['moving_average_count']} moving averages")
     
     # Pattern 2: Conditional aggregation
     print(f"\n2. Conditional Aggregation (adults only):")
-    adult_total = 0
-    adult_count = 0
-    minor_count = 0
-    
-    for age in stream_user_ages():
-        if age >= 18:
-            adult_total += age
-            adult_count += 1
-        else:
-            minor_count += 1
+    adult_count = aggregates['adult_count']
     
     if adult_count > 0:
-        adult_average = adult_total / adult_count
+        adult_average = aggregates['adult_total'] / adult_count
         print(f"   Average age of adults: {adult_average:.2f}")
-        print(f"   Adults: {adult_count}, Minors: {minor_count}")
+        print(f"   Adults: {adult_count}, Minors: {aggregates['minor_count']}")
 
 
 if __name__ == "__main__":
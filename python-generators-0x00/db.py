@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Shared Database Connection Module
+This module owns the ALX_prodev connection settings and connection pool used
+by the generator modules, so pooling and connection caching live in one place.
+"""
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.pooling import MySQLConnectionPool, PoolError
+import os
+import atexit
+import threading
+
+# Load environment variables for database connection
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    # dotenv not available, use default values
+    pass
+
+# Connection arguments for the ALX_prodev database, read from the
+# environment once at import time rather than on every connect
+CFG = {
+    'host': os.getenv('MYSQL_HOST', 'localhost'),
+    'database': 'ALX_prodev',
+    'user': os.getenv('MYSQL_USER', 'root'),
+    'password': os.getenv('MYSQL_PASSWORD', '')
+}
+
+# Connections are handed out from a pool created once at import time, so
+# only the first few callers pay for the TCP and authentication handshake
+try:
+    POOL = MySQLConnectionPool(
+        pool_name='alx',
+        pool_size=int(os.getenv('MYSQL_POOL_SIZE', '8')),
+        use_pure=False,  # C extension reads whole row chunks per fetch
+        consume_results=True,  # Discard unread rows when a stream stops early
+        **CFG
+    )
+except Error:
+    # Database unavailable at import time (e.g. development); connect directly
+    POOL = None
+
+
+def connect_to_prodev(compress=False):
+    """
+    Establishes connection to the ALX_prodev database
+
+    Connections come from the shared pool when it is available; calling
+    close() on them returns them to the pool instead of disconnecting.
+
+    Args:
+        compress (bool): Open a dedicated connection with zlib compression
+                         of the client/server protocol instead of a pooled
+                         one. Worth the extra handshake and CPU only for
+                         long scans over a slow network.
+
+    Returns:
+        connection object to ALX_prodev database if successful, None otherwise
+    """
+    try:
+        if POOL is not None and not compress:
+            try:
+                return POOL.get_connection()
+            except PoolError:
+                # Every pooled connection is in use; open a dedicated one
+                pass
+
+        connection = mysql.connector.connect(
+            **CFG,
+            use_pure=False,
+            consume_results=True,
+            compress=compress
+        )
+        if connection.is_connected():
+            return connection
+    except Error as e:
+        print(f"Error connecting to ALX_prodev database: {e}")
+        return None
+
+
+# Per-thread cached connection, and whether a caller is currently using it
+_tls = threading.local()
+
+
+def get_conn():
+    """
+    Return this thread's cached connection, opening it on first use
+
+    Reusing the connection skips the pool lookup (and its lock) on every
+    call. If the cached connection is still busy (e.g. with an unfinished
+    stream), a dedicated connection is returned instead so the two never
+    interleave. Every connection must be handed back with release_conn().
+
+    Returns:
+        connection object, or None if connecting failed
+    """
+    if getattr(_tls, 'busy', False):
+        return connect_to_prodev()
+    connection = getattr(_tls, 'conn', None)
+    if connection is None or not connection.is_connected():
+        if connection is not None:
+            # Hand the dropped connection back so its pool slot is reused
+            try:
+                connection.close()
+            except Error:
+                pass
+        connection = _tls.conn = connect_to_prodev()
+    _tls.busy = connection is not None
+    return connection
+
+
+def release_conn(connection):
+    """
+    Hand back a connection obtained from get_conn()
+
+    The thread's cached connection stays open for the next caller; a
+    dedicated connection is closed (returned to the pool).
+
+    Args:
+        connection: connection returned by get_conn()
+    """
+    if connection is getattr(_tls, 'conn', None):
+        _tls.busy = False
+        return
+    try:
+        connection.close()
+    except Error:
+        pass
+
+
+@atexit.register
+def _close_tls():
+    """Return the cached connection to the pool at interpreter shutdown"""
+    connection = getattr(_tls, 'conn', None)
+    if connection is not None:
+        _tls.conn = None
+        connection.close()
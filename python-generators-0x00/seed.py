@@ -6,10 +6,34 @@ This script sets up MySQL database, creates tables, and populates data from CSV
 
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.pooling import MySQLConnectionPool, PoolError
 import csv
 import os
-import uuid
-from decimal import Decimal
+import re
+import threading
+from itertools import chain
+
+# Number of CSV rows sent to the server per multi-row INSERT
+INSERT_BATCH_SIZE = 1000
+
+# Connection arguments for the ALX_prodev database
+_PRODEV_CFG = {
+    'host': 'localhost',
+    'database': 'ALX_prodev',
+    'user': 'root',  # Change this to your MySQL username
+    'password': 'root'  # Change this to your MySQL password
+}
+
+# Pool behind connect_to_prodev(); created on first use because ALX_prodev
+# only exists once create_database() has run
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+# Canonical 36-character UUID text; one compiled regex match is much cheaper
+# than constructing a uuid.UUID
+_UUID_RE = re.compile(
+    r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+)
 
 
 def connect_db():
@@ -50,20 +74,45 @@ def create_database(connection):
         print(f"Error creating database: {e}")
 
 
+def _get_pool():
+    """
+    Return the ALX_prodev connection pool, creating it on first use
+    
+    The pool opens all of its connections up front, and seeding holds
+    at most two at a time (insert_data's plus one helper's), so it is kept
+    small.
+    
+    Returns:
+        MySQLConnectionPool of MYSQL_SEED_POOL_SIZE connections (default 2)
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = MySQLConnectionPool(
+                pool_name='alx_seed',
+                pool_size=int(os.getenv('MYSQL_SEED_POOL_SIZE', '2')),
+                **_PRODEV_CFG
+            )
+    return _POOL
+
+
 def connect_to_prodev():
     """
     Connects specifically to the ALX_prodev database
     
+    Connections come from a pool, so repeated calls skip the TCP and
+    authentication handshake; calling close() on them returns them to the
+    pool instead of disconnecting.
+    
     Returns:
         connection object to ALX_prodev database if successful, None otherwise
     """
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='ALX_prodev',
-            user='root',  # Change this to your MySQL username
-            password='root'  # Change this to your MySQL password
-        )
+        try:
+            connection = _get_pool().get_connection()
+        except PoolError:
+            # Every pooled connection is in use; open a dedicated one
+            connection = mysql.connector.connect(**_PRODEV_CFG)
         if connection.is_connected():
             print("Successfully connected to ALX_prodev database")
             return connection
@@ -72,6 +121,38 @@ def connect_to_prodev():
         return None
 
 
+def _check_user_data_schema(cursor):
+    """
+    Check that user_data uses the current BINARY(16) user_id column
+    
+    CREATE TABLE IF NOT EXISTS leaves an existing table untouched, so a
+    table seeded before user_id became BINARY(16) (and age TINYINT
+    UNSIGNED) keeps its old CHAR(36) column: BIN_TO_UUID() then fails in
+    the generator modules and insert_data() would write raw bytes into it.
+    
+    Args:
+        cursor: cursor on the ALX_prodev database
+        
+    Returns:
+        bool: True if the schema is current, False otherwise
+    """
+    cursor.execute(
+        "SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.columns "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data' "
+        "AND COLUMN_NAME IN ('user_id', 'age')"
+    )
+    column_types = {name: data_type.lower() for name, data_type in cursor.fetchall()}
+    
+    if column_types.get('user_id') == 'binary' and column_types.get('age') == 'tinyint':
+        return True
+    
+    print("Table user_data predates the BINARY(16) user_id schema "
+          f"(found user_id {column_types.get('user_id')}, age {column_types.get('age')}). "
+          "Drop it (DROP TABLE user_data, or cleanup_database()) and re-run "
+          "the seed script to recreate and reseed it.")
+    return False
+
+
 def create_table(connection):
     """
     Creates the user_data table if it doesn't exist
@@ -85,17 +166,20 @@ def create_table(connection):
         # SQL query to create user_data table
         create_table_query = """
         CREATE TABLE IF NOT EXISTS user_data (
-            user_id CHAR(36) PRIMARY KEY,
+            user_id BINARY(16) PRIMARY KEY,
             name VARCHAR(255) NOT NULL,
             email VARCHAR(255) NOT NULL,
-            age DECIMAL(3,0) NOT NULL,
-            INDEX idx_user_id (user_id)
+            age TINYINT UNSIGNED NOT NULL,
+            INDEX idx_user_age (age)
         )
         """
         
         cursor.execute(create_table_query)
         connection.commit()
-        print("Table user_data created successfully")
+        
+        # An existing table is not altered; make sure it has the new schema
+        if _check_user_data_schema(cursor):
+            print("Table user_data created successfully")
         cursor.close()
         
     except Error as e:
@@ -114,12 +198,18 @@ def insert_data(connection, csv_file):
     try:
         cursor = connection.cursor()
         
-        # First check if table already has data
-        cursor.execute("SELECT COUNT(*) FROM user_data")
-        count = cursor.fetchone()[0]
+        # Refuse to seed a table left over from the old CHAR(36) schema
+        if not _check_user_data_schema(cursor):
+            cursor.close()
+            return
+        
+        # Then check if table already has data; EXISTS stops at the first
+        # row instead of counting the whole table
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM user_data)")
+        has_data = cursor.fetchone()[0]
         
-        if count > 0:
-            print(f"Table already contains {count} records. Skipping data insertion.")
+        if has_data:
+            print("Table already contains records. Skipping data insertion.")
             cursor.close()
             return
         
@@ -128,12 +218,27 @@ def insert_data(connection, csv_file):
             print(f"CSV file {csv_file} not found!")
             return
             
+        # executemany() rewrites a plain INSERT ... VALUES into one multi-row
+        # INSERT per batch; it cannot rewrite INSERT IGNORE, so duplicates are
+        # skipped with a no-op ON DUPLICATE KEY UPDATE instead
         insert_query = """
-        INSERT IGNORE INTO user_data (user_id, name, email, age) 
+        INSERT INTO user_data (user_id, name, email, age) 
         VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE user_id = user_id
         """
         
+        # Full batches use one multi-row INSERT prepared on the server once:
+        # each batch then ships only its parameters (in the binary protocol)
+        # instead of a new statement text to be parsed
+        batch_query = (
+            "INSERT INTO user_data (user_id, name, email, age) VALUES "
+            + ", ".join(["(%s, %s, %s, %s)"] * INSERT_BATCH_SIZE)
+            + " ON DUPLICATE KEY UPDATE user_id = user_id"
+        )
+        prepared_cursor = connection.cursor(prepared=True)
+        
         inserted_count = 0
+        batch = []
         
         with open(csv_file, 'r', encoding='utf-8') as file:
             csv_reader = csv.DictReader(file)
@@ -151,15 +256,13 @@ def insert_data(connection, csv_file):
                         continue
                     
                     # Validate UUID format
-                    try:
-                        uuid.UUID(user_id)
-                    except ValueError:
+                    if not _UUID_RE.fullmatch(user_id):
                         print(f"Invalid UUID format: {user_id}. Skipping row.")
                         continue
                     
-                    # Validate age
+                    # Validate age (a plain int, matching the TINYINT column)
                     try:
-                        age = Decimal(age_str)
+                        age = int(age_str)
                         if age < 0 or age > 150:  # Basic age validation
                             print(f"Invalid age: {age}. Skipping row.")
                             continue
@@ -167,14 +270,27 @@ def insert_data(connection, csv_file):
                         print(f"Invalid age format: {age_str}. Skipping row.")
                         continue
                     
-                    # Insert the record
-                    cursor.execute(insert_query, (user_id, name, email, age))
+                    # Queue the record; full batches go out in one statement.
+                    # user_id is stored as its 16 raw bytes (the same bytes as
+                    # MySQL's UUID_TO_BIN(user_id)), less than half the size
+                    # of the 36-character text in the clustered primary key
+                    batch.append((bytes.fromhex(user_id.replace('-', '')), name, email, age))
                     inserted_count += 1
                     
                 except Exception as row_error:
                     print(f"Error processing row: {row_error}")
                     continue
+                
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    prepared_cursor.execute(batch_query, tuple(chain.from_iterable(batch)))
+                    batch.clear()
+        
+        # Insert the remaining (fewer than INSERT_BATCH_SIZE) records
+        if batch:
+            cursor.executemany(insert_query, batch)
+        prepared_cursor.close()
         
+        # Commit once for the whole file
         connection.commit()
         print(f"Successfully inserted {inserted_count} records into user_data table")
         cursor.close()
@@ -194,11 +310,12 @@ def validate_database_setup():
     Returns:
         tuple: (success: bool, message: str)
     """
+    connection = connect_to_prodev()
+    if not connection:
+        return False, "Could not connect to ALX_prodev database"
+    
+    cursor = None
     try:
-        connection = connect_to_prodev()
-        if not connection:
-            return False, "Could not connect to ALX_prodev database"
-        
         cursor = connection.cursor()
         
         # Check if table exists
@@ -218,13 +335,20 @@ def validate_database_setup():
         cursor.execute("SELECT COUNT(*) FROM user_data")
         record_count = cursor.fetchone()[0]
         
-        cursor.close()
-        connection.close()
-        
         return True, f"Database setup successful. {record_count} records in user_data table"
         
     except Error as e:
         return False, f"Database validation error: {e}"
+    
+    finally:
+        # Return the connection to the pool on every path, without an
+        # is_connected() ping first
+        if cursor:
+            cursor.close()
+        try:
+            connection.close()
+        except Error:
+            pass
 
 
 # Additional utility functions for debugging and maintenance
@@ -237,25 +361,34 @@ def get_sample_data(limit=5):
         limit: number of records to retrieve
         
     Returns:
-        list of tuples containing sample data
+        list of (user_id, name, age) tuples containing sample data
     """
+    connection = connect_to_prodev()
+    if not connection:
+        return []
+    
+    cursor = None
     try:
-        connection = connect_to_prodev()
-        if not connection:
-            return []
-        
+        # The limit is passed as a parameter rather than formatted into the
+        # SQL; only the columns shown in a sample are fetched
         cursor = connection.cursor()
-        cursor.execute(f"SELECT * FROM user_data LIMIT {limit}")
-        results = cursor.fetchall()
-        
-        cursor.close()
-        connection.close()
-        
-        return results
+        cursor.execute(
+            "SELECT BIN_TO_UUID(user_id), name, age FROM user_data LIMIT %s",
+            (limit,)
+        )
+        return cursor.fetchall()
         
     except Error as e:
         print(f"Error retrieving sample data: {e}")
         return []
+    
+    finally:
+        if cursor:
+            cursor.close()
+        try:
+            connection.close()
+        except Error:
+            pass
 
 
 def cleanup_database():